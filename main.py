@@ -2,12 +2,14 @@
 # Ponto de entrada da aplicação FastAPI.
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from src.infrastructure.api.routes import router
 
 app = FastAPI(
     title="Generic Time Series Forecast API (Clean Architecture)",
     description="API para treino e previsão de séries temporais, seguindo Clean Architecture.",
     version="0.2.0",
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(router)
@@ -17,8 +19,19 @@ async def read_root():
     return {"message": "Welcome to the Generic Time Series Forecast API!"}
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    print("Para rodar a API localmente, execute no terminal:")
-    print("uvicorn main:app --reload")
+    # uvloop e httptools vêm com uvicorn[standard]; com vários workers o app precisa ser passado como string.
+    # Para desenvolvimento com reload: uvicorn main:app --reload
+    # Número de workers: WEB_CONCURRENCY, ou um por CPU. Cada worker tem seu próprio pool de treino,
+    # então até workers * TRAINING_MAX_WORKERS treinos podem rodar ao mesmo tempo; reduza um dos
+    # dois para limitar a CPU usada por treinos simultâneos.
     print("Acesse http://127.0.0.1:8000/docs para a documentação interativa.")
-    # uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count())),
+    )
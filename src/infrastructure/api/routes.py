@@ -1,26 +1,122 @@
 # src/infrastructure/api/routes.py
 
-from fastapi import APIRouter, HTTPException, status, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from src.domain.models import TrainRequest, ForecastInputData
 from src.use_cases.train_anomaly_model_use_case import TrainAnomalyModelUseCase
 from src.use_cases.detect_anomalies_use_case import DetectAnomaliesUseCase
 import pandas as pd
-from io import StringIO
+import numpy as np
 import logging
-from typing import List
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 router = APIRouter()
 
-def run_anomaly_training_in_background(app_id: str, series_data: List[ForecastInputData]):
+# Training processes per API worker process. Every API worker has its own pool, so a server
+# started with N workers (see main.py) runs up to N * TRAINING_MAX_WORKERS trainings at once.
+TRAINING_MAX_WORKERS = int(os.environ.get("TRAINING_MAX_WORKERS", 2))
+_training_pool: ProcessPoolExecutor | None = None
+
+FORECAST_INPUT_COLUMNS = list(ForecastInputData.model_fields)
+NUMERIC_INPUT_COLUMNS = [name for name, field in ForecastInputData.model_fields.items() if field.annotation is int]
+
+def parse_forecast_csv(file: BinaryIO) -> pd.DataFrame:
+    """
+    Parses an uploaded ';'-separated CSV into a DataFrame with the ForecastInputData columns.
+    The file is read directly by the parser, without loading the upload into memory first,
+    and the schema is validated once for the whole file instead of once per row.
+    """
+    df = pd.read_csv(file, sep=';', dtype=str, engine=CSV_ENGINE)
+
+    missing_columns = [col for col in FORECAST_INPUT_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing columns in CSV: {', '.join(missing_columns)}")
+
+    df = df[FORECAST_INPUT_COLUMNS]
+    df[NUMERIC_INPUT_COLUMNS] = df[NUMERIC_INPUT_COLUMNS].apply(_parse_integer_column)
+    return df
+
+def _parse_integer_column(values: pd.Series) -> pd.Series:
+    """
+    Converts a column of integer strings to int64. Like the int fields of ForecastInputData,
+    it accepts integral floats such as '1.0'; empty, fractional or non-numeric values and
+    values outside the int64 range raise ValueError instead of being coerced.
+    """
+    try:
+        numbers = pd.to_numeric(values, errors='raise')
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid integer in column '{values.name}': {e}")
+
+    if numbers.dtype.kind == 'f':
+        integral = np.isfinite(numbers) & (numbers == np.trunc(numbers))
+        in_range = (numbers >= -2.0 ** 63) & (numbers < 2.0 ** 63)
+        if not (integral & in_range).all():
+            raise ValueError(f"Column '{values.name}' must contain only integers within the int64 range")
+    elif numbers.dtype.kind == 'u' and (numbers > np.iinfo(np.int64).max).any():
+        raise ValueError(f"Column '{values.name}' must contain only integers within the int64 range")
+    return numbers.astype(np.int64)
+
+def get_training_pool() -> ProcessPoolExecutor:
+    """
+    Returns this API process' training pool, creating it on first use.
+    Training is CPU-bound, so it runs outside the API process to avoid the GIL, and each
+    worker is replaced after one job so memory from large trainings is returned to the OS.
+    The TRAINING_MAX_WORKERS limit applies per API worker process, not to the whole server.
+    """
+    global _training_pool
+    if _training_pool is None:
+        _training_pool = ProcessPoolExecutor(
+            max_workers=TRAINING_MAX_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            max_tasks_per_child=1
+        )
+    return _training_pool
+
+def _log_training_failure(future: Future):
+    """Logs trainings that failed outside the use case, e.g. because the worker process died."""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logging.error(f"[BACKGROUND-TRAIN] Training job failed: {error!r}", exc_info=error)
+
+def submit_training(fn, /, **kwargs) -> Future:
+    """
+    Submits a training job to the training pool. A worker that dies, e.g. killed for running
+    out of memory, breaks the whole pool; it is then replaced and the job resubmitted.
+    """
+    global _training_pool
+    try:
+        future = get_training_pool().submit(fn, **kwargs)
+    except BrokenProcessPool:
+        logging.warning("[BACKGROUND-TRAIN] Training pool is broken, probably after a worker died. Recreating it.")
+        _training_pool.shutdown(wait=False, cancel_futures=True)
+        _training_pool = None
+        future = get_training_pool().submit(fn, **kwargs)
+    future.add_done_callback(_log_training_failure)
+    return future
+
+def run_anomaly_training_in_background(app_id: str, df: pd.DataFrame):
     """Function that runs the anomaly detection training use case and logs the result."""
     try:
         logging.info(f"[BACKGROUND-TRAIN] Starting anomaly model training for app_id: {app_id}")
         use_case = TrainAnomalyModelUseCase()
-        response = use_case.execute(
+        response = use_case.execute_df(
             app_id=app_id,
-            series_data=series_data
+            df=df
         )
         logging.info(f"[BACKGROUND-TRAIN] Anomaly model training completed for app_id: {app_id}. Result: {response.message}")
     except Exception as e:
@@ -29,7 +125,6 @@ def run_anomaly_training_in_background(app_id: str, series_data: List[ForecastIn
 @router.post("/train-anomaly-model-csv/{app_id}", status_code=status.HTTP_202_ACCEPTED)
 async def train_anomaly_model_from_csv(
     app_id: str,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(..., description=".csv file with historical data for training. Separator must be ';'.")
 ):
     """
@@ -40,21 +135,18 @@ async def train_anomaly_model_from_csv(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The file must be a .csv")
 
     try:
-        content = await file.read()
-        content_str = content.decode('utf-8')
-        df = pd.read_csv(StringIO(content_str), sep=';', dtype=str)
-        series_data = [ForecastInputData(**row) for row in df.to_dict(orient='records')]
+        df = await run_in_threadpool(parse_forecast_csv, file.file)
 
-        background_tasks.add_task(
+        submit_training(
             run_anomaly_training_in_background,
             app_id=app_id,
-            series_data=series_data
+            df=df
         )
         return {"message": f"Anomaly detection model training process for '{app_id}' from file '{file.filename}' started in the background."}
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-@router.post("/detect-anomalies-csv/{app_id}", status_code=status.HTTP_200_OK)
+@router.post("/detect-anomalies-csv/{app_id}", status_code=status.HTTP_200_OK, response_class=ORJSONResponse)
 async def detect_anomalies_from_csv(
     app_id: str,
     file: UploadFile = File(..., description=".csv file with data to check for anomalies. Separator must be ';'.")
@@ -66,23 +158,26 @@ async def detect_anomalies_from_csv(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The file must be a .csv")
 
     try:
-        content = await file.read()
-        content_str = content.decode('utf-8')
-        df = pd.read_csv(StringIO(content_str), sep=';', dtype=str)
-        series_data = [ForecastInputData(**row) for row in df.to_dict(orient='records')]
+        df = await run_in_threadpool(parse_forecast_csv, file.file)
 
         use_case = DetectAnomaliesUseCase()
-        result_df = use_case.execute(
+        result_df = use_case.execute_df(
             app_id=app_id,
-            series_data=series_data
+            df=df
         )
         
         anomalies = result_df[result_df['anomaly'] == -1]
         
-        return {
+        # Returning the response directly skips FastAPI's jsonable_encoder pass over every row.
+        # Anomalies are sent column-oriented: names once, values as a row-major array that
+        # orjson serializes natively (it requires a C-contiguous ndarray).
+        return ORJSONResponse({
             "message": f"Anomaly detection complete. Found {len(anomalies)} potential anomalies.",
-            "anomalies": anomalies.to_dict(orient='records')
-        }
+            "anomalies": {
+                "columns": anomalies.columns.tolist(),
+                "data": np.ascontiguousarray(anomalies.to_numpy())
+            }
+        })
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -3,7 +3,67 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
+
+
+def _rolling_window_stats(values: np.ndarray, windows: list[int]) -> np.ndarray:
+    """
+    Computes trailing rolling mean, std and sum (with min_periods=1) for every column
+    of a 2D array and every window, from one pair of cumulative sums shared by all windows,
+    so the cost does not depend on the window sizes.
+    Matches pandas' rolling().mean/std/sum, except that the std of a single observation
+    is 0 instead of NaN, which is how the features use it.
+    Accumulation happens in float64; the result is a float32 array of shape
+    (rows, columns, windows, 3) holding mean, std and sum along the last axis.
+    """
+    n_rows, n_cols = values.shape
+    # Centering reduces cancellation error in the E[X^2] - E[X]^2 variance formula
+    column_means = values.mean(axis=0)
+    centered = values - column_means
+    cumsum = np.zeros((n_rows + 1, n_cols))
+    np.cumsum(centered, axis=0, out=cumsum[1:])
+    cumsum_sq = np.zeros((n_rows + 1, n_cols))
+    np.cumsum(centered * centered, axis=0, out=cumsum_sq[1:])
+
+    end = np.arange(1, n_rows + 1)
+    out = np.empty((n_rows, n_cols, len(windows), 3), dtype=np.float32)
+    for i, window in enumerate(windows):
+        start = np.maximum(end - window, 0)
+        counts = (end - start)[:, np.newaxis]
+
+        centered_sum = cumsum[1:] - cumsum[start]
+        centered_sum_sq = cumsum_sq[1:] - cumsum_sq[start]
+        centered_mean = centered_sum / counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (centered_sum_sq - centered_sum * centered_mean) / (counts - 1)
+
+        mean = centered_mean + column_means
+        out[:, :, i, 0] = mean
+        out[:, :, i, 1] = np.where(counts > 1, np.sqrt(np.maximum(variance, 0)), 0)
+        out[:, :, i, 2] = mean * counts
+    return out
+
+
+TIME_FEATURE_COLUMNS = ['hour', 'dayofweek', 'dayofyear', 'month', 'year']
+
+
+def _time_features(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Decomposes a DatetimeIndex into hour, dayofweek, dayofyear, month and year using NumPy
+    datetime arithmetic on its datetime64 values, returned as an (N, 5) int16 block.
+    """
+    timestamps = index.values
+    days = timestamps.astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    years = days.astype('datetime64[Y]')
+
+    block = np.empty((len(index), len(TIME_FEATURE_COLUMNS)), dtype=np.int16)
+    block[:, 0] = (timestamps.astype('datetime64[h]') - days).astype(np.int64)
+    block[:, 1] = (days.astype(np.int64) + 3) % 7 # 1970-01-01 was a Thursday; Monday is 0
+    block[:, 2] = (days - years.astype('datetime64[D]')).astype(np.int64) + 1
+    block[:, 3] = months.astype(np.int64) % 12 + 1
+    block[:, 4] = years.astype(np.int64) + 1970
+    return block
+
 
 class AnomalyDetectionModel:
     def __init__(self, contamination=0.01, random_state=42):
@@ -11,10 +71,31 @@ class AnomalyDetectionModel:
             contamination=contamination,
             random_state=random_state,
             n_estimators=100,
-            max_samples='auto'
+            max_samples='auto',
+            n_jobs=-1
         )
-        self.scaler = StandardScaler()
+        # Per-feature standardization statistics, learned in train()
+        self._mean = None
+        self._std = None
         self.feature_columns = []
+        self._feature_schema = pd.Index([])
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled model. Models saved before standardization moved in-house carry a
+        fitted StandardScaler and no feature schema; both are converted here, so existing
+        model files keep working without being retrained.
+        """
+        scaler = state.pop('scaler', None)
+        self.__dict__.update(state)
+        if getattr(self, '_mean', None) is None:
+            self._mean = None
+            self._std = None
+            if scaler is not None and hasattr(scaler, 'mean_'):
+                self._mean = np.asarray(scaler.mean_, dtype=np.float32)
+                self._std = np.asarray(scaler.scale_, dtype=np.float32)
+        if not hasattr(self, '_feature_schema'):
+            self._feature_schema = pd.Index(getattr(self, 'feature_columns', []))
 
     def _create_features(self, df: pd.DataFrame):
         """
@@ -25,33 +106,41 @@ class AnomalyDetectionModel:
         if not isinstance(df.index, pd.DatetimeIndex):
             raise ValueError("DataFrame index must be a DatetimeIndex.")
 
-        features_df = df.copy() # Work on a copy to avoid modifying original df
-
         # Identify numerical columns to apply rolling features
-        numerical_cols = features_df.select_dtypes(include=np.number).columns.tolist()
+        numerical_cols = df.select_dtypes(include=np.number).columns.tolist()
+        values = df[numerical_cols].to_numpy(dtype=np.float64, copy=True)
+        np.nan_to_num(values, copy=False) # Missing values count as 0
 
-        # Rolling window features for each numerical column
+        # Rolling window features for each numerical column, computed for all columns at once
         windows = [5, 15, 60] # 5-min, 15-min, 1-hour windows
-        for col in numerical_cols:
-            for window in windows:
-                features_df[f'{col}_rolling_mean_{window}'] = features_df[col].rolling(window=window, min_periods=1).mean()
-                features_df[f'{col}_rolling_std_{window}'] = features_df[col].rolling(window=window, min_periods=1).std()
-                features_df[f'{col}_rolling_sum_{window}'] = features_df[col].rolling(window=window, min_periods=1).sum()
-
-        # Time-based features
-        features_df['hour'] = features_df.index.hour
-        features_df['dayofweek'] = features_df.index.dayofweek
-        features_df['dayofyear'] = features_df.index.dayofyear
-        features_df['month'] = features_df.index.month
-        features_df['year'] = features_df.index.year
-        
-        features_df.fillna(0, inplace=True) # Fill NaNs from rolling std of first element
+        rolling_stats = _rolling_window_stats(values, windows)
+        rolling_columns = [
+            f'{col}_rolling_{stat}_{window}'
+            for col in numerical_cols
+            for window in windows
+            for stat in ('mean', 'std', 'sum')
+        ]
+
+        # Assemble every feature block in a single concat instead of copying the input and
+        # inserting one column at a time. Features are kept in float32: half the memory
+        # traffic through the scaling and the trees.
+        features_df = pd.concat([
+            pd.DataFrame(values.astype(np.float32), index=df.index, columns=numerical_cols),
+            pd.DataFrame(rolling_stats.reshape(len(df), -1), index=df.index, columns=rolling_columns),
+            # Time-based features
+            pd.DataFrame(_time_features(df.index), index=df.index, columns=TIME_FEATURE_COLUMNS)
+        ], axis=1)
 
-        # Store feature columns for consistency during prediction
-        self.feature_columns = features_df.columns.tolist()
-        
         return features_df
 
+    def _scale(self, features: np.ndarray) -> np.ndarray:
+        """
+        Standardizes a float32 feature matrix in place with the statistics learned in train().
+        """
+        np.subtract(features, self._mean, out=features)
+        np.divide(features, self._std, out=features)
+        return features
+
     def train(self, df: pd.DataFrame):
         """
         Trains the Isolation Forest model with the given multivariate DataFrame.
@@ -60,9 +149,18 @@ class AnomalyDetectionModel:
             raise ValueError("The DataFrame for training cannot be empty.")
 
         features_df = self._create_features(df)
+
+        # Store feature columns for consistency during prediction, plus a frozen Index
+        # so predict() can reindex without rebuilding and re-hashing it on every call
+        self.feature_columns = features_df.columns.tolist()
+        self._feature_schema = pd.Index(self.feature_columns)
         
-        # Scale features
-        scaled_features = self.scaler.fit_transform(features_df)
+        # Scale features in place; constant features keep a unit scale, as in StandardScaler
+        features = features_df.to_numpy(dtype=np.float32, copy=True)
+        self._mean = features.mean(axis=0, dtype=np.float64).astype(np.float32)
+        std = features.std(axis=0, dtype=np.float64).astype(np.float32)
+        self._std = np.where(std == 0, np.float32(1), std)
+        scaled_features = self._scale(features)
         
         # Train model
         self.model.fit(scaled_features)
@@ -72,20 +170,17 @@ class AnomalyDetectionModel:
         Predicts anomalies in a new multivariate DataFrame.
         Returns a Series with -1 for anomalies and 1 for normal points.
         """
-        if not hasattr(self.scaler, 'mean_'):
+        if self._mean is None:
             raise RuntimeError("The model has not been trained. Call .train() first.")
         if not isinstance(df.index, pd.DatetimeIndex):
             raise ValueError("DataFrame index must be a DatetimeIndex.")
 
         features_df = self._create_features(df)
         
-        # Ensure feature consistency: add missing columns, reorder
-        for col in self.feature_columns:
-            if col not in features_df.columns:
-                features_df[col] = 0 # Add missing columns with default value
-        features_df = features_df[self.feature_columns] # Reorder columns
+        # Ensure feature consistency: add missing columns with 0 and reorder in a single reindex
+        features_df = features_df.reindex(columns=self._feature_schema, fill_value=0)
         
-        scaled_features = self.scaler.transform(features_df)
+        scaled_features = self._scale(features_df.to_numpy(dtype=np.float32, copy=True))
         
         predictions = self.model.predict(scaled_features)
         
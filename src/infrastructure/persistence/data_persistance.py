@@ -3,13 +3,48 @@
 from pathlib import Path
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
 MODELS_DIR = Path("data")
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Formatos conhecidos da coluna 'timestamp', testados em ordem, cada um sobre a coluna inteira.
+TIMESTAMP_FORMATS = ['ISO8601', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H', '%d/%m/%Y']
+
+
+def _parse_timestamp_column(values: pd.Series) -> pd.Series:
+    """
+    Converte a coluna 'timestamp' para datetime64[ns], mantendo o fuso horário se houver. Usa o
+    primeiro formato conhecido que serve para todas as linhas e só recorre ao parse linha a linha
+    (format='mixed') se nenhum servir. Como no pd.read_csv, uma coluna que não vira data é
+    devolvida sem alterações.
+    """
+    for date_format in TIMESTAMP_FORMATS:
+        try:
+            parsed = pd.to_datetime(values, format=date_format)
+            break
+        except (ValueError, TypeError):
+            continue
+    else:
+        try:
+            parsed = pd.to_datetime(values, format='mixed', dayfirst=True)
+        except (ValueError, TypeError):
+            return values
+    if not pd.api.types.is_datetime64_any_dtype(parsed):
+        return parsed # Ex: fusos horários diferentes entre as linhas
+    return parsed.dt.as_unit('ns')
+
 
 def load_csv(data_filename: str) -> pd.DataFrame:
     """
     Carrega dados de um arquivo CSV.
+    Usa o leitor multithread do pyarrow quando disponível; caso contrário, usa o pd.read_csv.
+    Nos dois casos só a coluna 'timestamp' vira data: as demais mantêm os tipos do pd.read_csv.
 
     Args:
         data_filename (str): O nome do arquivo CSV a ser carregado (ex: "data_nfae.csv").
@@ -20,6 +55,26 @@ def load_csv(data_filename: str) -> pd.DataFrame:
     file_path = MODELS_DIR / (data_filename + ".csv")
     if not file_path.exists():
         raise FileNotFoundError(f"Arquivo de dados não encontrado: {file_path}")
-    with open(file_path, "r") as f:
-        df = pd.read_csv(f, parse_dates=['timestamp'], date_format='mixed', dayfirst=True, sep=';')
-    return df
\ No newline at end of file
+
+    if pacsv is None:
+        with open(file_path, "r") as f:
+            df = pd.read_csv(f, parse_dates=['timestamp'], date_format='mixed', dayfirst=True, sep=';')
+        return df
+
+    parse_options = pacsv.ParseOptions(delimiter=';')
+    # O pyarrow infere datas em qualquer coluna com cara de data, o que o pd.read_csv não faz.
+    # Os tipos são inferidos no primeiro bloco; as colunas inferidas como data voltam a ser texto.
+    inferred_schema = pacsv.open_csv(file_path, parse_options=parse_options).schema
+    column_types = {field.name: pa.string() for field in inferred_schema if pa.types.is_temporal(field.type)}
+    column_types['timestamp'] = pa.string()
+
+    table = pacsv.read_csv(
+        file_path,
+        parse_options=parse_options,
+        # Campos vazios viram nulos (NaN), como no pd.read_csv
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+    df = table.to_pandas()
+    if 'timestamp' in df.columns:
+        df['timestamp'] = _parse_timestamp_column(df['timestamp'])
+    return df
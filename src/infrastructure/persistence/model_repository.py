@@ -1,64 +1,166 @@
 # src/infrastructure/persistence/model_repository.py
 
 import joblib
+import contextlib
+import fcntl
+import functools
 import os
-import json
+import orjson
 import logging
+import threading
 from datetime import datetime
 from typing import Any
 
 MODELS_DIR = "models"
 PRODUCTION_MODEL_INFO_PATH = os.path.join(MODELS_DIR, "production_model.json")
+REGISTRY_LOCK_PATH = os.path.join(MODELS_DIR, "production_model.lock")
 
 os.makedirs(MODELS_DIR, exist_ok=True)
 
+logger = logging.getLogger(__name__)
+
+# Cache do registro de produção em memória, revalidado pelo mtime e tamanho do arquivo.
+_REGISTRY_CACHE: dict[str, Any] = {"stamp": None, "data": {}}
+_REGISTRY_LOCK = threading.RLock()
+
+# Último número de versão por app_id, mantido em memória enquanto o registro não muda em disco.
+_VERSION_COUNTER: dict[str, int] = {}
+
+# Profundidade do bloqueio entre processos na thread que o detém (o flock não é reentrante).
+_FILE_LOCK_DEPTH = 0
+
+@contextlib.contextmanager
+def _registry_write_lock():
+    """
+    Serializa as escritas no registro entre threads e entre processos (ex: os workers de
+    treino), com um flock exclusivo em REGISTRY_LOCK_PATH. Pode ser aninhado na mesma thread.
+    """
+    global _FILE_LOCK_DEPTH
+    with _REGISTRY_LOCK:
+        if _FILE_LOCK_DEPTH:
+            _FILE_LOCK_DEPTH += 1
+            try:
+                yield
+            finally:
+                _FILE_LOCK_DEPTH -= 1
+            return
+
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        with open(REGISTRY_LOCK_PATH, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _FILE_LOCK_DEPTH = 1
+            try:
+                yield
+            finally:
+                _FILE_LOCK_DEPTH = 0
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _load_registry() -> dict:
+    """
+    Retorna o conteúdo de production_model.json, relendo o arquivo apenas quando ele muda.
+    Retorna um dicionário vazio se o arquivo não existir ou não puder ser lido.
+    O dicionário retornado é compartilhado e não deve ser modificado.
+    """
+    with _REGISTRY_LOCK:
+        try:
+            stat = os.stat(PRODUCTION_MODEL_INFO_PATH)
+        except FileNotFoundError:
+            if _REGISTRY_CACHE["stamp"] is not None:
+                _VERSION_COUNTER.clear()
+            _REGISTRY_CACHE.update(stamp=None, data={})
+            return _REGISTRY_CACHE["data"]
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if _REGISTRY_CACHE["stamp"] != stamp:
+            try:
+                with open(PRODUCTION_MODEL_INFO_PATH, 'rb') as f:
+                    data = orjson.loads(f.read())
+            except orjson.JSONDecodeError:
+                logger.info("Erro ao decodificar JSON em %s. O arquivo pode estar corrompido.", PRODUCTION_MODEL_INFO_PATH)
+                data = {}
+            except Exception as e:
+                logger.info("Erro ao carregar informações do modelo de produção: %s", e)
+                data = {}
+            _REGISTRY_CACHE.update(stamp=stamp, data=data)
+            # O arquivo foi alterado fora deste processo: os contadores são recalculados a partir dele
+            _VERSION_COUNTER.clear()
+        return _REGISTRY_CACHE["data"]
+
 def _get_next_version(app_id: str) -> str:
     """
     Determina a próxima versão incremental para um dado app_id.
+    O registro só é consultado na primeira versão de cada app_id ou depois que o arquivo mudou.
+    Deve ser chamada com _registry_write_lock, para que outro processo não aloque a mesma versão.
     """
-    current_version_num = 0
-    if os.path.exists(PRODUCTION_MODEL_INFO_PATH):
-        try:
-            with open(PRODUCTION_MODEL_INFO_PATH, 'r') as f:
-                production_info = json.load(f)
-                app_info = production_info.get(app_id)
-                if app_info and "version" in app_info:
-                    # Extrai o número da versão (ex: "v1" -> 1)
-                    try:
-                        current_version_num = int(app_info["version"].replace("v", ""))
-                    except ValueError:
-                        # Se a versão não for numérica (ex: v2023...), reinicia a contagem
-                        current_version_num = 0
-        except json.JSONDecodeError:
-            pass # Arquivo corrompido ou vazio, tratar como se não houvesse versão anterior
-
-    next_version_num = current_version_num + 1
-    return f"v{next_version_num}"
-
-def save_model(model: Any, app_id: str, metrics: dict) -> tuple[str, str]:
-    """
-    Salva um modelo treinado em um arquivo .joblib com versionamento baseado em timestamp.
+    with _REGISTRY_LOCK:
+        registry = _load_registry()
+        if app_id not in _VERSION_COUNTER:
+            current_version_num = 0
+            app_info = registry.get(app_id)
+            if app_info and "version" in app_info:
+                # Extrai o número da versão (ex: "v1" -> 1)
+                try:
+                    current_version_num = int(app_info["version"].replace("v", ""))
+                except ValueError:
+                    # Se a versão não for numérica (ex: v2023...), reinicia a contagem
+                    current_version_num = 0
+            _VERSION_COUNTER[app_id] = current_version_num
+
+        _VERSION_COUNTER[app_id] += 1
+        return f"v{_VERSION_COUNTER[app_id]}"
+
+def save_model(model: Any, app_id: str, metrics: dict, training_data_hash: str | None = None) -> tuple[str, str]:
+    """
+    Salva um modelo treinado em um arquivo .joblib com versionamento incremental.
+    O modelo só é promovido no registro de produção depois que o arquivo foi gravado.
 
     Args:
         model (Any): O objeto do modelo a ser salvo.
         app_id (str): O ID da aplicação associado ao modelo.
         metrics (dict): Dicionário de métricas de avaliação do modelo.
+        training_data_hash (str | None): Hash dos dados de treino, registrado junto ao modelo.
 
     Returns:
         tuple[str, str]: Uma tupla contendo a versão do modelo e o caminho completo do arquivo.
     """
-    version = _get_next_version(app_id)
-    file_name = f"{app_id}_model_{version}.joblib"
-    file_path = os.path.join(MODELS_DIR, file_name)
+    with _registry_write_lock():
+        version = _get_next_version(app_id)
+        file_path = os.path.join(MODELS_DIR, f"{app_id}_model_{version}.joblib")
+        # Arquivos de versões que o registro não conhece mais (ex: depois de apagá-lo) não são sobrescritos
+        while os.path.exists(file_path):
+            version = _get_next_version(app_id)
+            file_path = os.path.join(MODELS_DIR, f"{app_id}_model_{version}.joblib")
 
-    update_production_model_info(app_id, version, file_path, metrics)
+        # Sem compressão, para que o arquivo possa ser carregado via memory-map. A gravação vai
+        # para um arquivo temporário que substitui o final: truncar um arquivo mapeado por um
+        # worker da API em uso poderia derrubá-lo (SIGBUS).
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            joblib.dump(model, tmp_path, compress=0)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
 
-    joblib.dump(model, file_path)
+        update_production_model_info(app_id, version, file_path, metrics, training_data_hash)
     return version, file_path
 
+@functools.lru_cache(maxsize=32)
+def _load_model_file(file_path: str, stamp: tuple[int, int]) -> Any:
+    """
+    Desserializa um arquivo de modelo, mantendo os mais usados em memória.
+    Os arrays numpy são mapeados somente leitura (mmap), então vários workers que carregam
+    o mesmo arquivo compartilham as páginas no cache do sistema operacional.
+    O stamp (mtime, tamanho) faz parte da chave: se o arquivo for regravado, inclusive
+    por outro processo, a entrada antiga deixa de ser usada e sai do cache por LRU.
+    """
+    return joblib.load(file_path, mmap_mode='r')
+
 def load_model(app_id: str, version: str) -> Any:
     """
     Carrega um modelo de um arquivo .joblib com base no app_id e versão.
+    O modelo fica em cache no processo, evitando desserializar o arquivo a cada requisição.
 
     Args:
         app_id (str): O ID da aplicação associado ao modelo.
@@ -72,62 +174,48 @@ def load_model(app_id: str, version: str) -> Any:
     """
     file_name = f"{app_id}_model_{version}.joblib"
     file_path = os.path.join(MODELS_DIR, file_name)
-    if not os.path.exists(file_path):
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
         raise FileNotFoundError(f"Modelo não encontrado: {file_path}")
-    return joblib.load(file_path)
+    return _load_model_file(file_path, (stat.st_mtime_ns, stat.st_size))
 
 def load_production_model_info(app_id: str) -> dict | None:
     """
     Carrega as informações do modelo em produção para um dado app_id.
     Retorna None se o arquivo não existir ou se o app_id não for encontrado.
     """
-    if not os.path.exists(PRODUCTION_MODEL_INFO_PATH):
-        return None
-    try:
-        with open(PRODUCTION_MODEL_INFO_PATH, 'r') as f:
-            production_info = json.load(f)
-            return production_info.get(app_id)
-    except json.JSONDecodeError:
-        logging.info(f"Erro ao decodificar JSON em {PRODUCTION_MODEL_INFO_PATH}. O arquivo pode estar corrompido.")
-        return None
-    except Exception as e:
-        logging.info(f"Erro ao carregar informações do modelo de produção: {e}")
-        return None
-
-def update_production_model_info(app_id: str, version: str, path: str, metrics: dict):
+    return _load_registry().get(app_id)
+
+def update_production_model_info(app_id: str, version: str, path: str, metrics: dict, training_data_hash: str | None = None):
     """
     Atualiza as informações do modelo em produção no arquivo JSON.
+    A escrita é atômica: o conteúdo vai para um arquivo temporário que substitui o original.
+    O hash dos dados de treino, quando informado, permite pular retreinos com os mesmos dados.
     """
-    logging.info(f"DEBUG: update_production_model_info started for app_id: {app_id}")
-    os.makedirs(MODELS_DIR, exist_ok=True)
-    production_info = {}
-    if os.path.exists(PRODUCTION_MODEL_INFO_PATH):
-        logging.info(f"DEBUG: {PRODUCTION_MODEL_INFO_PATH} exists. Attempting to read.")
+    logger.debug("update_production_model_info started for app_id: %s", app_id)
+    with _registry_write_lock():
+        production_info = dict(_load_registry())
+        production_info[app_id] = {
+            "version": version,
+            "path": path,
+            "metrics": metrics,
+            "timestamp_promoted": datetime.now().isoformat()
+        }
+        if training_data_hash is not None:
+            production_info[app_id]["training_data_hash"] = training_data_hash
+
+        logger.debug("Attempting to write to %s.", PRODUCTION_MODEL_INFO_PATH)
+        tmp_path = f"{PRODUCTION_MODEL_INFO_PATH}.{os.getpid()}.tmp"
         try:
-            with open(PRODUCTION_MODEL_INFO_PATH, 'r') as f:
-                production_info = json.load(f)
-            logging.info(f"DEBUG: Successfully read {PRODUCTION_MODEL_INFO_PATH}.")
-        except json.JSONDecodeError:
-            logging.info(f"DEBUG: Warning: {PRODUCTION_MODEL_INFO_PATH} is corrupted or empty. Creating a new one.")
-            production_info = {} # Reset if corrupted
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(production_info, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, PRODUCTION_MODEL_INFO_PATH)
+            stat = os.stat(PRODUCTION_MODEL_INFO_PATH)
+            _REGISTRY_CACHE.update(stamp=(stat.st_mtime_ns, stat.st_size), data=production_info)
+            logger.debug("Successfully wrote to %s.", PRODUCTION_MODEL_INFO_PATH)
         except Exception as e:
-            logging.info(f"DEBUG: Error reading {PRODUCTION_MODEL_INFO_PATH}: {e}")
-            production_info = {} # Reset on any read error
-
-    production_info[app_id] = {
-        "version": version,
-        "path": path,
-        "metrics": metrics,
-        "timestamp_promoted": datetime.now().isoformat()
-    }
-
-    logging.info(f"DEBUG: Attempting to write to {PRODUCTION_MODEL_INFO_PATH}.")
-    try:
-        with open(PRODUCTION_MODEL_INFO_PATH, 'w') as f:
-            json.dump(production_info, f, indent=4)
-        logging.info(f"DEBUG: Successfully wrote to {PRODUCTION_MODEL_INFO_PATH}.")
-    except Exception as e:
-        logging.info(f"DEBUG: Error writing to {PRODUCTION_MODEL_INFO_PATH}: {e}")
+            logger.error("Error writing to %s: %s", PRODUCTION_MODEL_INFO_PATH, e)
 
 if __name__ == "__main__":
     # Exemplo de uso (requer um objeto ProphetModel para testar)
@@ -0,0 +1,125 @@
+# src/use_cases/_preprocess.py
+
+import hashlib
+import numpy as np
+import pandas as pd
+from operator import attrgetter
+from src.domain.models import ForecastInputData
+from typing import List
+
+DAY_FORMAT = '%d/%m/%Y'
+
+# ForecastInputData columns that are not model features
+NON_FEATURE_COLUMNS = ['DIA', 'HORA', 'DIA_DA_SEMANA']
+
+# ForecastInputData fields used as model features, in declaration order
+NUMERIC_FIELDS = [name for name in ForecastInputData.model_fields if name not in NON_FEATURE_COLUMNS]
+
+
+def _assemble_timestamps(dia: np.ndarray, hora: np.ndarray) -> np.ndarray | None:
+    """
+    Decodes zero-padded 'dd/mm/YYYY' days and 'HH' hours into datetime64 values with
+    integer arithmetic on the string buffers. Returns None when any value does not
+    follow that layout, so the caller can fall back to the general parser.
+    """
+    if dia.dtype.itemsize != 10 * np.dtype('U1').itemsize:
+        return None
+    # Every character of a '<U10' array is one UCS-4 code point
+    digits = dia.view(np.uint32).reshape(len(dia), 10).astype(np.int64) - ord('0')
+    separators = digits[:, [2, 5]]
+    digits = digits[:, [0, 1, 3, 4, 6, 7, 8, 9]]
+    if (separators != ord('/') - ord('0')).any() or (digits < 0).any() or (digits > 9).any():
+        return None
+    day = digits[:, 0] * 10 + digits[:, 1]
+    month = digits[:, 2] * 10 + digits[:, 3]
+    year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+    # Whole years inside the datetime64[ns] range; its partial edge years are left to the fallback
+    if (year < 1678).any() or (year > 2261).any():
+        return None
+
+    # One or two ASCII digits; shorter strings are padded with NUL code points
+    if hora.dtype.itemsize > 2 * np.dtype('U1').itemsize:
+        return None
+    hour_width = hora.dtype.itemsize // np.dtype('U1').itemsize
+    hour_digits = hora.view(np.uint32).reshape(len(hora), hour_width).astype(np.int64) - ord('0')
+    padding = hour_digits == -ord('0')
+    if padding[:, 0].any() or ((hour_digits < 0) & ~padding).any() or (hour_digits > 9).any():
+        return None
+    hour = hour_digits[:, 0]
+    if hour_digits.shape[1] == 2:
+        hour = np.where(padding[:, 1], hour, hour * 10 + hour_digits[:, 1])
+    if (month < 1).any() or (month > 12).any() or (day < 1).any() or (hour > 23).any():
+        return None
+
+    month_start = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    days = month_start.astype('datetime64[D]') + (day - 1)
+    if (days >= (month_start + 1).astype('datetime64[D]')).any():
+        return None # Day past the end of its month, e.g. 31/04
+    return (days + hour.astype('timedelta64[h]')).astype('datetime64[ns]')
+
+
+def parse_timestamps(dia, hora) -> pd.DatetimeIndex:
+    """
+    Parses the DIA ('dd/mm/YYYY') and HORA ('HH') values into the 'ds' DatetimeIndex.
+    Well-formed input is assembled directly from its digits. Anything else parses DIA alone
+    with pd.to_datetime, which also reports the parsing errors, and adds HORA as a number
+    of hours, without building 'DIA HORA' strings. Values the '%d/%m/%Y %H' format rejects,
+    including empty ones, raise ValueError.
+    """
+    timestamps = _assemble_timestamps(np.asarray(dia, dtype=str), np.asarray(hora, dtype=str))
+    if timestamps is not None:
+        return pd.DatetimeIndex(timestamps, name='ds')
+
+    try:
+        # Whitespace after DIA only widens the separator of the '%d/%m/%Y %H' format
+        dia_text = pd.Series(dia, dtype=object).str.rstrip()
+        days = pd.to_datetime(dia_text.to_numpy(), format=DAY_FORMAT, cache=True)
+        if days.isna().any():
+            raise ValueError("DIA vazio ou ausente")
+
+        # Optional leading whitespace, then the hour pattern strptime uses for '%H'
+        hora_text = pd.Series(np.asarray(hora, dtype=str))
+        if not hora_text.str.fullmatch(r'\s*(?:2[0-3]|[0-1]\d|\d)').all():
+            raise ValueError("HORA deve ser uma hora inteira entre 0 e 23")
+        hours = hora_text.str.strip().astype(np.int64).to_numpy()
+
+        return pd.DatetimeIndex(days + pd.to_timedelta(hours, unit='h'), name='ds')
+    except Exception as e:
+        raise ValueError(f"Erro ao parsear 'DIA' e 'HORA': {e}.")
+
+
+def parse_forecast_input(series_data: List[ForecastInputData]) -> pd.DataFrame:
+    """
+    Builds the numeric, DatetimeIndex-ed frame the anomaly models expect directly from the
+    records, materializing only the feature fields and the timestamps. The result can be
+    shared by several use cases over the same payload; they do not modify it.
+    """
+    values = np.empty((len(series_data), len(NUMERIC_FIELDS)), dtype=np.float32)
+    for i, field in enumerate(NUMERIC_FIELDS):
+        values[:, i] = np.fromiter(map(attrgetter(field), series_data), dtype=np.float32, count=len(series_data))
+    index = parse_timestamps([item.DIA for item in series_data], [item.HORA for item in series_data])
+    return pd.DataFrame(values, index=index, columns=NUMERIC_FIELDS)
+
+
+def prepare_forecast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns a frame with the ForecastInputData columns, e.g. parsed in bulk from a CSV upload,
+    into the same numeric, DatetimeIndex-ed frame as parse_forecast_input. The input is not modified.
+    """
+    # Convert all numerical columns to float32 in a single cast; they are already numeric
+    # after the bulk CSV parsing. Selecting them also leaves the string columns behind.
+    numeric_cols = [col for col in df.columns if col not in NON_FEATURE_COLUMNS]
+    features = df[numeric_cols].astype(np.float32).fillna(np.float32(0))
+    features.index = parse_timestamps(df['DIA'], df['HORA'])
+    return features
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """
+    Hashes the columns, timestamps and values of a prepared, DatetimeIndex-ed feature frame.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update('\x1f'.join(map(str, df.columns)).encode())
+    digest.update(df.index.as_unit('ns').asi8.tobytes())
+    digest.update(np.ascontiguousarray(df.to_numpy(dtype=np.float32)).tobytes())
+    return digest.hexdigest()
@@ -1,60 +1,150 @@
 # src/use_cases/detect_anomalies_use_case.py
 
 import pandas as pd
+import numpy as np
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from src.domain.models import ForecastInputData
+from src.use_cases._preprocess import frame_digest, parse_forecast_input, prepare_forecast_frame
 from src.infrastructure.persistence.model_repository import load_model, load_production_model_info
-from typing import List
+from typing import Dict, List
+
+# Predictions of recently scored frames, keyed by model, version and a digest of the frame,
+# so repeated polls of the same window skip the forest entirely. The cache is bounded by the
+# total number of cached rows (one int8 per row), and frames above PREDICTION_CACHE_MAX_FRAME_ROWS,
+# e.g. bulk CSV scoring, are neither hashed nor cached.
+PREDICTION_CACHE_MAX_ROWS = 2_000_000
+PREDICTION_CACHE_MAX_FRAME_ROWS = 100_000
+_PREDICTION_CACHE: OrderedDict[tuple, np.ndarray] = OrderedDict()
+_PREDICTION_CACHE_LOCK = threading.Lock()
+_prediction_cache_rows = 0
+
+def _cache_predictions(cache_key: tuple, predictions: np.ndarray):
+    """
+    Stores predictions (-1/1 as int8), evicting the least recently used entries while the
+    cache holds more than PREDICTION_CACHE_MAX_ROWS rows.
+    """
+    global _prediction_cache_rows
+    with _PREDICTION_CACHE_LOCK:
+        previous = _PREDICTION_CACHE.pop(cache_key, None)
+        if previous is not None:
+            _prediction_cache_rows -= len(previous)
+        _PREDICTION_CACHE[cache_key] = predictions
+        _prediction_cache_rows += len(predictions)
+        while _prediction_cache_rows > PREDICTION_CACHE_MAX_ROWS:
+            _, evicted = _PREDICTION_CACHE.popitem(last=False)
+            _prediction_cache_rows -= len(evicted)
 
 class DetectAnomaliesUseCase:
-    def execute(self, app_id: str, series_data: List[ForecastInputData]) -> pd.DataFrame:
+    def execute(self, app_id: str, series_data: List[ForecastInputData], df: pd.DataFrame | None = None) -> pd.DataFrame:
         """
         Executes the use case for detecting anomalies in a time series.
 
         Args:
             app_id (str): The base ID of the application.
             series_data (List[ForecastInputData]): The time series data to check for anomalies.
+            df (pd.DataFrame | None): series_data already parsed with parse_forecast_input, to
+                skip parsing it again; series_data is then ignored and may be empty.
+                It is not modified.
+
+        Returns:
+            pd.DataFrame: A DataFrame with the original data and an 'anomaly' column.
+        """
+        if (df.empty if df is not None else not series_data):
+            raise ValueError("The input data for anomaly detection cannot be empty.")
+
+        if df is not None:
+            return df.assign(anomaly=self._predict(app_id, df).to_numpy())
+
+        df = parse_forecast_input(series_data)
+        df['anomaly'] = self._predict(app_id, df).to_numpy()
+
+        return df
+
+    def execute_df(self, app_id: str, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Executes the anomaly detection use case on a DataFrame holding the ForecastInputData
+        columns, e.g. parsed in bulk from a CSV upload, without building one model per row.
+
+        Args:
+            app_id (str): The base ID of the application.
+            df (pd.DataFrame): The time series data to check for anomalies.
 
         Returns:
             pd.DataFrame: A DataFrame with the original data and an 'anomaly' column.
         """
-        if not series_data:
+        if df.empty:
             raise ValueError("The input data for anomaly detection cannot be empty.")
 
-        df = pd.DataFrame([item.model_dump() for item in series_data])
+        df = prepare_forecast_frame(df)
+
+        # df is built by this use case, so the result column is added in place instead of on a copy
+        df['anomaly'] = self._predict(app_id, df).to_numpy()
 
-        try:
-            df['ds'] = pd.to_datetime(df['DIA'] + ' ' + df['HORA'], format='%d/%m/%Y %H')
-        except Exception as e:
-            raise ValueError(f"Erro ao parsear 'DIA' e 'HORA': {e}.")
+        return df
 
-        # Convert all numerical columns to float
-        for col in df.columns:
-            if col not in ['DIA', 'HORA', 'ds']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        df.fillna(0, inplace=True) # Fill any NaNs created by coercion
+    def execute_batch(self, app_ids: List[str], series_data: List[ForecastInputData], df: pd.DataFrame | None = None) -> Dict[str, pd.DataFrame]:
+        """
+        Detects anomalies in one time series with the production models of several applications.
+        The input is parsed once and then scored by each model in a thread pool.
+
+        Args:
+            app_ids (List[str]): The base IDs of the applications.
+            series_data (List[ForecastInputData]): The time series data to check for anomalies.
+            df (pd.DataFrame | None): series_data already parsed with parse_forecast_input, to
+                skip parsing it again; series_data is then ignored and may be empty.
+                It is not modified.
+
+        Returns:
+            Dict[str, pd.DataFrame]: For each app_id, a DataFrame with the data and an 'anomaly' column.
+        """
+        if (df.empty if df is not None else not series_data):
+            raise ValueError("The input data for anomaly detection cannot be empty.")
 
-        df = df.set_index('ds') # Set 'ds' as index for the model
+        if df is None:
+            df = parse_forecast_input(series_data)
 
-        # Drop original string columns that are not features
-        df = df.drop(columns=['DIA', 'HORA', 'DIA_DA_SEMANA'], errors='ignore')
+        # The prepared frame is shared read-only; each app gets its own result frame
+        with ThreadPoolExecutor() as executor:
+            predictions = executor.map(lambda app_id: self._predict(app_id, df), app_ids)
+            return {
+                app_id: df.assign(anomaly=app_predictions.to_numpy())
+                for app_id, app_predictions in zip(app_ids, predictions)
+            }
 
+    def _predict(self, app_id: str, df: pd.DataFrame) -> pd.Series:
+        """
+        Scores a prepared frame with the production model of the given application.
+        """
         model_id = f"{app_id.lower()}_multivariate_anomaly"
-        
+
         # Load production model information
         prod_model_info = load_production_model_info(model_id)
         if prod_model_info is None or "version" not in prod_model_info:
             raise ValueError(f"No production model found for '{model_id}'. Please train a model first.")
-            
+
         # Load the actual model using the version info
         model_version = prod_model_info["version"]
+        cacheable = len(df) <= PREDICTION_CACHE_MAX_FRAME_ROWS
+        if cacheable:
+            # The promotion time tells apart models that reuse a version after the registry is reset
+            cache_key = (model_id, model_version, prod_model_info.get("timestamp_promoted"), frame_digest(df))
+            with _PREDICTION_CACHE_LOCK:
+                cached = _PREDICTION_CACHE.get(cache_key)
+                if cached is not None:
+                    _PREDICTION_CACHE.move_to_end(cache_key)
+            if cached is not None:
+                return pd.Series(cached.astype(np.int64), index=df.index, name='anomaly')
+
         model = load_model(model_id, model_version)
-        
+
         if model is None:
             raise ValueError(f"Could not load model '{model_id}' version '{model_version}'.")
 
-        anomaly_predictions = model.predict(df)
-        
-        result_df = df.copy()
-        result_df['anomaly'] = anomaly_predictions.values
-        
-        return result_df
+        predictions = model.predict(df)
+
+        if cacheable:
+            _cache_predictions(cache_key, predictions.to_numpy(dtype=np.int8))
+
+        return predictions
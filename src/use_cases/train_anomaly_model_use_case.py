@@ -1,50 +1,86 @@
 # src/use_cases/train_anomaly_model_use_case.py
 
 import pandas as pd
+import numpy as np
 from src.domain.models import ForecastInputData, TrainResponse
-from src.infrastructure.forecasting_models.anomaly_detection_model import AnomalyDetectionModel
-from src.infrastructure.persistence.model_repository import save_model
+from src.use_cases._preprocess import frame_digest, parse_forecast_input, prepare_forecast_frame
+from src.infrastructure.persistence.model_repository import load_production_model_info, save_model
 from typing import List
 
+MAX_TRAINING_SAMPLES = 10000
+
 class TrainAnomalyModelUseCase:
-    def execute(self, app_id: str, series_data: List[ForecastInputData]) -> TrainResponse:
+    def execute(self, app_id: str, series_data: List[ForecastInputData], df: pd.DataFrame | None = None) -> TrainResponse:
         """
         Executes the use case for training an anomaly detection model.
 
         Args:
             app_id (str): The base ID of the application.
             series_data (List[ForecastInputData]): Historical data for training.
+            df (pd.DataFrame | None): series_data already parsed with parse_forecast_input, to
+                skip parsing it again; series_data is then ignored and may be empty.
+                It is not modified.
 
         Returns:
             TrainResponse: Response from the training operation.
         """
-        if not series_data:
+        if (df.empty if df is not None else not series_data):
             raise ValueError("The data for training cannot be empty.")
 
-        MAX_TRAINING_SAMPLES = 10000
-        df = pd.DataFrame([item.model_dump() for item in series_data])
+        if df is not None:
+            if len(df) > MAX_TRAINING_SAMPLES:
+                df = df.sample(n=MAX_TRAINING_SAMPLES, random_state=42)
+            return self._train(app_id, df)
 
-        if len(df) > MAX_TRAINING_SAMPLES:
-            df = df.sample(n=MAX_TRAINING_SAMPLES, random_state=42)
+        if len(series_data) > MAX_TRAINING_SAMPLES:
+            # Same rows df.sample(n=MAX_TRAINING_SAMPLES, random_state=42) picks, chosen before
+            # the frame is built so that discarded records are never materialized
+            rows = np.random.RandomState(42).choice(len(series_data), MAX_TRAINING_SAMPLES, replace=False)
+            series_data = [series_data[i] for i in rows]
 
-        try:
-            df['ds'] = pd.to_datetime(df['DIA'] + ' ' + df['HORA'], format='%d/%m/%Y %H')
-        except Exception as e:
-            raise ValueError(f"Erro ao parsear 'DIA' e 'HORA': {e}.")
+        return self._train(app_id, parse_forecast_input(series_data))
+
+    def execute_df(self, app_id: str, df: pd.DataFrame) -> TrainResponse:
+        """
+        Executes the training use case on a DataFrame holding the ForecastInputData columns,
+        e.g. parsed in bulk from a CSV upload, without building one model per row.
 
-        # Convert all numerical columns to float
-        for col in df.columns:
-            if col not in ['DIA', 'HORA', 'ds']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        df.fillna(0, inplace=True) # Fill any NaNs created by coercion
+        Args:
+            app_id (str): The base ID of the application.
+            df (pd.DataFrame): Historical data for training.
+
+        Returns:
+            TrainResponse: Response from the training operation.
+        """
+        if df.empty:
+            raise ValueError("The data for training cannot be empty.")
 
-        df = df.set_index('ds') # Set 'ds' as index for the model
+        if len(df) > MAX_TRAINING_SAMPLES:
+            df = df.sample(n=MAX_TRAINING_SAMPLES, random_state=42)
 
-        # Drop original string columns that are not features
-        df = df.drop(columns=['DIA', 'HORA', 'DIA_DA_SEMANA'], errors='ignore')
+        return self._train(app_id, prepare_forecast_frame(df))
 
+    def _train(self, app_id: str, df: pd.DataFrame) -> TrainResponse:
+        """
+        Trains and saves the model from a numeric, DatetimeIndex-ed frame.
+        Training is skipped when the production model was trained on exactly the same data.
+        """
         model_id = f"{app_id.lower()}_multivariate_anomaly"
 
+        training_data_hash = frame_digest(df)
+        prod_model_info = load_production_model_info(model_id)
+        if prod_model_info and prod_model_info.get("training_data_hash") == training_data_hash:
+            return TrainResponse(
+                message=f"Anomaly detection model '{model_id}' is already trained on this data (version: {prod_model_info['version']}).",
+                model_id=model_id,
+                model_version=prod_model_info["version"],
+                metrics=prod_model_info.get("metrics")
+            )
+
+        # Imported on first fit, so that importing the use case (e.g. from the API process) does not
+        # pay for scikit-learn, and requests skipped above never load it
+        from src.infrastructure.forecasting_models.anomaly_detection_model import AnomalyDetectionModel
+
         model = AnomalyDetectionModel()
         model.train(df)
 
@@ -53,7 +89,7 @@ class TrainAnomalyModelUseCase:
         # The "metrics" can be statistics about the training data if needed.
         metrics = {"training_samples": len(df)}
 
-        model_version, saved_path = save_model(model, model_id, metrics)
+        model_version, saved_path = save_model(model, model_id, metrics, training_data_hash)
 
         message = f"Anomaly detection model '{model_id}' trained and saved (version: {model_version})."
 